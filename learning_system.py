@@ -12,124 +12,649 @@ Features:
 - Confidence calibration
 """
 
+import atexit
+import copy
+import heapq
+import io
 import json
+import mmap
 import os
 import time
 from datetime import datetime
-from collections import defaultdict, Counter
+from collections import defaultdict, Counter, deque
 import statistics
 
+# Fast JSON serialization
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+# Streaming JSON parser for migrating large old-format learning files
+try:
+    import ijson
+    HAS_IJSON = True
+except ImportError:
+    HAS_IJSON = False
+
+# Compression for archived prediction logs
+try:
+    import zstandard as zstd
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+# Learning data files: dirty-set tag -> (file name, LearningSystem attribute)
+LEARNING_FILES = {
+    "holder": ("holder_learning.json", "holder_learning_db"),
+    "sign": ("sign_learning.json", "sign_learning_db"),
+    "perf": ("performance_stats.json", "performance_stats"),
+    "mistakes": ("common_mistakes.json", "common_mistakes"),
+}
+
+# Append-only prediction logs: (bot, kind) -> JSONL file name
+PREDICTION_LOGS = {
+    ("holder", "successful_predictions"): "holder_successful.jsonl",
+    ("holder", "corrections"): "holder_corrections.jsonl",
+    ("sign", "successful_predictions"): "sign_successful.jsonl",
+    ("sign", "corrections"): "sign_corrections.jsonl",
+}
+
+# Learning files above this size are parsed incrementally (when ijson is available)
+LARGE_LEARNING_FILE_BYTES = 10_000_000
+
+# Prediction logs above this size are rotated into numbered segments
+# (compressed to .jsonl.zst archives when zstandard is available)
+ARCHIVE_LOG_BYTES = 16 * 1024 * 1024
+ZSTD_LEVEL = 3
+
+# File suffixes removed by clear_all_data, including temp files left behind
+# by an interrupted atomic write, legacy migration or segment compression
+DATA_FILE_SUFFIXES = (
+    ".json", ".jsonl", ".jsonl.zst",
+    ".json.tmp", ".jsonl.tmp", ".jsonl.zst.tmp",
+)
+
+# Holder mistakes reported in learning insights
+TOP_MISTAKES = 5
+
+# Recent predictions kept in memory per bot (for avg confidence reporting),
+# stored column-wise: one deque per field instead of one dict per record
+RECENT_PREDICTIONS = 100
+RECENT_COLUMNS = ("timestamp", "confidence")
+
+# Accuracy history entries kept (trend analysis only reads the last 20)
+ACCURACY_HISTORY_SIZE = 1000
+
+# Confidence calibration buckets: 0%, 10%, ... 100%
+CONFIDENCE_BUCKETS = 11
+
+# Coalesce saves: flush after this many records or this many seconds
+FLUSH_EVERY_RECORDS = 50
+FLUSH_INTERVAL_SECONDS = 5.0
+WRITE_BUFFER_SIZE = 1 << 20
+
+# Empty learning state; loaders and clear_all_data deep-copy these templates
+EMPTY_LEARNING_DB = {
+    "image_patterns": {},
+    "confidence_calibration": {},
+    "prompt_effectiveness": {}
+}
+
+EMPTY_PERFORMANCE_STATS = {
+    "holder_stats": {
+        "total_processed": 0,
+        "correct_predictions": 0,
+        "accuracy_history": deque(maxlen=ACCURACY_HISTORY_SIZE),
+        "confidence_total": [0] * CONFIDENCE_BUCKETS,
+        "confidence_correct": [0] * CONFIDENCE_BUCKETS
+    },
+    "sign_stats": {
+        "total_processed": 0,
+        "correct_predictions": 0,
+        "accuracy_history": deque(maxlen=ACCURACY_HISTORY_SIZE),
+        "sign_total": Counter(),
+        "sign_detected": Counter()
+    }
+}
+
+EMPTY_COMMON_MISTAKES = {
+    "labels": [],
+    "holder_mistakes": Counter(),
+    "sign_mistakes": Counter(),
+    "missed_signs": Counter(),
+    "false_positive_signs": Counter(),
+    "confusion_matrix": {}
+}
+
+def _json_default(obj):
+    """Serialize containers JSON doesn't know about"""
+    if isinstance(obj, deque):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def _format_timestamp(timestamp):
+    """Format an epoch timestamp for display (older records store ISO strings)"""
+    if isinstance(timestamp, str):
+        return timestamp
+    return datetime.fromtimestamp(timestamp).strftime('%d/%m/%Y %H:%M:%S')
+
+def _record_time(prediction_record):
+    """Get a prediction record's time as epoch seconds (older records store ISO strings)"""
+    timestamp = prediction_record.get("timestamp")
+    if isinstance(timestamp, str):
+        try:
+            return datetime.fromisoformat(timestamp).timestamp()
+        except ValueError:
+            return 0.0
+    return timestamp or 0.0
+
+def _intern_label(label, labels, label_ids):
+    """Get the small integer id for a material/type label, adding it if new"""
+    label_id = label_ids.get(label)
+    if label_id is None:
+        label_id = len(labels)
+        labels.append(label)
+        label_ids[label] = label_id
+    return label_id
+
+def _encode_mistake_key(mistake_key):
+    """Encode a (pred material, pred type, actual material, actual type) id tuple for JSON"""
+    return "%d/%d>%d/%d" % mistake_key
+
+def _decode_mistake_key(key, labels, label_ids):
+    """Decode a saved mistake key back into a label id tuple"""
+    if " -> " in key:
+        # Older files use "material+type -> material+type"
+        names = [name for side in key.split(" -> ") for name in side.split("+", 1)]
+        return tuple(_intern_label(name, labels, label_ids) for name in names)
+    predicted, actual = key.split(">")
+    return tuple(int(label_id) for label_id in predicted.split("/") + actual.split("/"))
+
+def _iter_json_sections(f, list_keys):
+    """Stream (key, value) pairs for the top-level entries of a JSON object
+    
+    Entries under list_keys are yielded item by item as (key, item) instead
+    of as one list.
+    """
+    builder = None
+    for prefix, event, value in ijson.parse(f, use_float=True):
+        if builder is None:
+            key = prefix[:-len(".item")] if prefix.endswith(".item") else prefix
+            if not key or "." in key or (key in list_keys) != (key != prefix):
+                continue
+            builder = ijson.ObjectBuilder()
+            depth = 0
+        
+        builder.event(event, value)
+        if event in ("start_map", "start_array"):
+            depth += 1
+        elif event in ("end_map", "end_array"):
+            depth -= 1
+        if depth == 0:
+            yield key, builder.value
+            builder = None
+
+def _dumps(obj):
+    """Serialize learning data to compact UTF-8 JSON bytes"""
+    if HAS_ORJSON:
+        return orjson.dumps(obj, default=_json_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=_json_default, ensure_ascii=False,
+                      separators=(",", ":")).encode('utf-8')
+
+def _loads(data):
+    """Parse learning data from UTF-8 JSON bytes"""
+    if HAS_ORJSON:
+        return orjson.loads(data)
+    return json.loads(data)
+
 class LearningSystem:
-    def __init__(self, data_path="learning_data"):
+    def __init__(self, data_path="learning_data", flush_every=FLUSH_EVERY_RECORDS,
+                 flush_interval=FLUSH_INTERVAL_SECONDS):
         """Initialize the learning system"""
         self.data_path = data_path
         self.ensure_data_directory()
         
+        # Write coalescing - only files in the dirty set are rewritten
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._dirty = set()
+        self._pending_writes = 0
+        self._last_flush = time.monotonic()
+        
+        # Derived reports are cached until the next recorded prediction
+        self._data_version = 0
+        self._insights_cache = None
+        self._prompts_cache = None
+        self._errors_cache = None
+        
         # Learning databases
-        self.holder_learning_db = self.load_learning_db("holder_learning.json")
-        self.sign_learning_db = self.load_learning_db("sign_learning.json")
+        self.holder_learning_db = self.load_learning_db("holder_learning.json", "holder")
+        self.sign_learning_db = self.load_learning_db("sign_learning.json", "sign")
+        
+        # Recent predictions - the full history lives in the JSONL logs
+        self.recent_predictions = {
+            "holder": self._new_recent_columns(),
+            "sign": self._new_recent_columns()
+        }
+        self.load_recent_predictions("holder")
+        self.load_recent_predictions("sign")
         
         # Performance tracking
         self.performance_stats = self.load_performance_stats()
         
         # Pattern recognition
         self.common_mistakes = self.load_common_mistakes()
+        self._label_ids = {label: label_id for label_id, label in enumerate(self.common_mistakes["labels"])}
+        self._top_mistakes = dict(self.common_mistakes["holder_mistakes"].most_common(TOP_MISTAKES))
+        
+        # Persist migrated old-format data right away (a failed save is retried on later flushes)
+        if self._dirty:
+            self.flush()
+        
+        # Don't lose coalesced records on shutdown
+        atexit.register(self.flush)
         
     def ensure_data_directory(self):
         """Create learning data directory if it doesn't exist"""
         if not os.path.exists(self.data_path):
             os.makedirs(self.data_path)
             
-    def load_learning_db(self, filename):
+    def load_learning_db(self, filename, bot):
         """Load learning database from file"""
         filepath = os.path.join(self.data_path, filename)
         try:
             if os.path.exists(filepath):
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                if HAS_IJSON and os.path.getsize(filepath) > LARGE_LEARNING_FILE_BYTES:
+                    return self._stream_learning_db(bot, filepath)
+                
+                with open(filepath, 'rb') as f:
+                    learning_db = _loads(f.read())
+                self._migrate_prediction_lists(bot, filepath, learning_db)
+                return learning_db
         except Exception as e:
             print(f"⚠️ Could not load {filename}: {e}")
         
         # Return default structure
-        return {
-            "corrections": [],
-            "successful_predictions": [],
-            "image_patterns": {},
-            "confidence_calibration": {},
-            "prompt_effectiveness": {}
-        }
+        return copy.deepcopy(EMPTY_LEARNING_DB)
+    
+    def _migrate_prediction_lists(self, bot, filepath, learning_db):
+        """Move prediction lists from an old-format database into legacy logs
+        
+        The legacy logs are rewritten whole, never appended to, and the
+        stripped database is saved only after they are complete. If that save
+        fails, the next start repeats the migration without duplicating records.
+        """
+        migrated = False
+        for kind in ("successful_predictions", "corrections"):
+            records = learning_db.pop(kind, None)
+            if records is None:
+                continue
+            
+            self._write_legacy_log(bot, kind, records)
+            migrated = True
+        
+        if migrated:
+            self._save_migrated_db(bot, filepath, learning_db)
+    
+    def _legacy_log_path(self, filename):
+        """Path of the log holding prediction records migrated from an old-format database"""
+        return os.path.join(self.data_path, filename[:-len(".jsonl")] + ".legacy.jsonl")
+    
+    def _write_legacy_log(self, bot, kind, records):
+        """Replace a legacy log with the given prediction records"""
+        legacy_path = self._legacy_log_path(PREDICTION_LOGS[(bot, kind)])
+        temp_path = legacy_path + ".tmp"
+        with open(temp_path, 'wb', buffering=WRITE_BUFFER_SIZE) as f:
+            for record in records:
+                f.write(_dumps(record) + b"\n")
+        os.replace(temp_path, legacy_path)
+    
+    def _save_migrated_db(self, bot, filepath, learning_db):
+        """Save a database stripped of its prediction lists once they are in legacy logs"""
+        try:
+            self._write_file(filepath, _dumps(learning_db))
+        except Exception as e:
+            # The old file still holds the lists; they are migrated again from scratch next time
+            print(f"⚠️ Could not save migrated {os.path.basename(filepath)}: {e}")
+            self._dirty.add(bot)
+    
+    def _stream_learning_db(self, bot, filepath):
+        """Migrate a large old-format database without materializing its prediction lists
+        
+        One streaming pass writes each old inline record to a legacy log temp
+        file and keeps only the small aggregate sections in memory. Nothing is
+        swapped in unless the whole file parsed, so a corrupt file never leaves
+        a partial migration behind.
+        """
+        learning_db = {}
+        temp_files = {}
+        try:
+            with open(filepath, 'rb') as f:
+                for key, value in _iter_json_sections(f, ("successful_predictions", "corrections")):
+                    if key not in ("successful_predictions", "corrections"):
+                        learning_db[key] = value
+                        continue
+                    
+                    temp_file = temp_files.get(key)
+                    if temp_file is None:
+                        legacy_path = self._legacy_log_path(PREDICTION_LOGS[(bot, key)])
+                        temp_file = temp_files[key] = open(legacy_path + ".tmp", 'wb', buffering=WRITE_BUFFER_SIZE)
+                    temp_file.write(_dumps(value) + b"\n")
+        finally:
+            for temp_file in temp_files.values():
+                temp_file.close()
+        
+        for temp_file in temp_files.values():
+            os.replace(temp_file.name, temp_file.name[:-len(".tmp")])
+        for key, default in EMPTY_LEARNING_DB.items():
+            learning_db.setdefault(key, copy.deepcopy(default))
+        
+        # Only old-format files grow this large, so always save the stripped version
+        self._save_migrated_db(bot, filepath, learning_db)
+        return learning_db
+    
+    def _new_recent_columns(self):
+        """Create empty column store for recent predictions"""
+        return {column: deque(maxlen=RECENT_PREDICTIONS) for column in RECENT_COLUMNS}
+    
+    def _append_recent(self, bot, prediction_record):
+        """Append a prediction record to the recent prediction columns"""
+        columns = self.recent_predictions[bot]
+        columns["timestamp"].append(prediction_record.get("timestamp"))
+        columns["confidence"].append(prediction_record.get("confidence", 0.5))
+    
+    def load_recent_predictions(self, bot):
+        """Load the most recent predictions for a bot from its logs"""
+        # Successes and corrections are logged separately; interleave them back into time order
+        logs = [self._recent_log_records(bot, kind) for kind in ("successful_predictions", "corrections")]
+        for prediction_record in heapq.merge(*logs, key=_record_time):
+            self._append_recent(bot, prediction_record)
+    
+    def _recent_log_records(self, bot, kind):
+        """Get the last RECENT_PREDICTIONS records of a log, oldest first
+        
+        Only the live log is read unless it holds fewer records than that, in
+        which case the newest archives are read back until the window is full.
+        """
+        filename = PREDICTION_LOGS[(bot, kind)]
+        records = list(deque(self._iter_log_file(os.path.join(self.data_path, filename)),
+                             maxlen=RECENT_PREDICTIONS))
+        for archive_path in reversed(self._archive_paths(filename)):
+            if len(records) >= RECENT_PREDICTIONS:
+                break
+            older = deque(self._iter_archive(archive_path), maxlen=RECENT_PREDICTIONS - len(records))
+            records[:0] = older
+        return records
+    
+    def _iter_prediction_log(self, bot, kind):
+        """Stream prediction records from a JSONL log, oldest archive first"""
+        filename = PREDICTION_LOGS[(bot, kind)]
+        for archive_path in self._archive_paths(filename):
+            yield from self._iter_archive(archive_path)
+        yield from self._iter_log_file(os.path.join(self.data_path, filename))
+    
+    def _iter_archive(self, archive_path):
+        """Stream prediction records from a compressed log archive"""
+        if archive_path.endswith(".jsonl"):
+            # Rotated but not compressed yet
+            yield from self._iter_log_file(archive_path)
+            return
+        if not HAS_ZSTD:
+            print(f"⚠️ Skipping {os.path.basename(archive_path)}: zstandard is not installed")
+            return
+        with open(archive_path, 'rb') as f:
+            reader = io.BufferedReader(zstd.ZstdDecompressor().stream_reader(f))
+            yield from self._parse_log_lines(reader)
+    
+    def _iter_log_file(self, filepath):
+        """Stream prediction records from an uncompressed JSONL log"""
+        if not os.path.exists(filepath) or os.path.getsize(filepath) == 0:
+            return
+        
+        # Map the log instead of reading it through a Python-level line loop
+        with open(filepath, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield from self._parse_log_lines(iter(mm.readline, b''))
+    
+    def _parse_log_lines(self, lines):
+        """Decode JSONL lines into prediction records"""
+        for line in lines:
+            try:
+                yield _loads(line)
+            except ValueError:
+                # Skip a torn line left by an interrupted append
+                continue
+    
+    def _rotated_logs(self, filename):
+        """Map each rotation number of a prediction log to its files
+        
+        A rotation is a pending <stem>.NNNN.jsonl file until it has been
+        compressed into <stem>.NNNN.jsonl.zst.
+        """
+        stem = filename[:-len(".jsonl")]
+        rotated = defaultdict(dict)
+        for name in os.listdir(self.data_path):
+            number, _, suffix = name[len(stem) + 1:].partition(".")
+            if name.startswith(stem + ".") and number.isdigit() and suffix in ("jsonl", "jsonl.zst"):
+                rotated[int(number)][suffix] = os.path.join(self.data_path, name)
+        return rotated
+    
+    def _archive_paths(self, filename):
+        """List the older segments of a prediction log in order
+        
+        The legacy log comes first, then each rotation: its compressed archive,
+        or the pending file if the archive has not been written yet.
+        """
+        rotated = self._rotated_logs(filename)
+        segments = [files.get("jsonl.zst", files.get("jsonl")) for _, files in sorted(rotated.items())]
+        
+        # Records migrated from an old-format database predate every rotation
+        legacy_path = self._legacy_log_path(filename)
+        if os.path.exists(legacy_path):
+            segments.insert(0, legacy_path)
+        return segments
+    
+    def archive_prediction_logs(self):
+        """Rotate prediction logs that outgrew ARCHIVE_LOG_BYTES and compress the rotations
+        
+        The live log is first renamed to a numbered pending file, so new records
+        go to a fresh log straight away and the startup reload stays bounded.
+        With zstandard available the pending file is compressed and deleted only
+        once its archive is in place; without it the pending file is kept as is.
+        A rotation interrupted at any step is finished on the next call, and
+        readers never see a record twice.
+        """
+        for filename in PREDICTION_LOGS.values():
+            filepath = os.path.join(self.data_path, filename)
+            rotated = self._rotated_logs(filename)
+            
+            if os.path.exists(filepath) and os.path.getsize(filepath) >= ARCHIVE_LOG_BYTES:
+                number = max(rotated, default=-1) + 1
+                pending_path = os.path.join(self.data_path, f"{filename[:-len('.jsonl')]}.{number:04d}.jsonl")
+                try:
+                    os.replace(filepath, pending_path)
+                    rotated[number]["jsonl"] = pending_path
+                except OSError as e:
+                    # e.g. the log is mapped by a reader on Windows; retried on the next save
+                    print(f"⚠️ Could not rotate {filename}: {e}")
+            
+            for files in rotated.values():
+                pending_path = files.get("jsonl")
+                if pending_path is None:
+                    continue
+                if "jsonl.zst" not in files and not HAS_ZSTD:
+                    continue
+                try:
+                    if "jsonl.zst" not in files:
+                        archive_path = pending_path + ".zst"
+                        temp_path = archive_path + ".tmp"
+                        with open(pending_path, 'rb') as src, open(temp_path, 'wb') as dst:
+                            zstd.ZstdCompressor(level=ZSTD_LEVEL).copy_stream(src, dst)
+                        os.replace(temp_path, archive_path)
+                    os.remove(pending_path)
+                except Exception as e:
+                    print(f"⚠️ Could not archive {os.path.basename(pending_path)}: {e}")
+    
+    def _log_prediction(self, bot, kind, prediction_record):
+        """Append a prediction record to its JSONL log"""
+        filepath = os.path.join(self.data_path, PREDICTION_LOGS[(bot, kind)])
+        with open(filepath, 'ab') as f:
+            f.write(_dumps(prediction_record) + b"\n")
+        self._append_recent(bot, prediction_record)
     
     def load_performance_stats(self):
         """Load performance statistics"""
         filepath = os.path.join(self.data_path, "performance_stats.json")
         try:
             if os.path.exists(filepath):
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                with open(filepath, 'rb') as f:
+                    performance_stats = _loads(f.read())
+                
+                # Keep only the tail of the accuracy history
+                for stats in performance_stats.values():
+                    stats["accuracy_history"] = deque(
+                        stats.get("accuracy_history", [])[-ACCURACY_HISTORY_SIZE:],
+                        maxlen=ACCURACY_HISTORY_SIZE
+                    )
+                
+                # Older files keep calibration as {"80": {"total": .., "correct": ..}}
+                holder_stats = performance_stats["holder_stats"]
+                legacy_calibration = holder_stats.pop("confidence_accuracy", None)
+                if legacy_calibration is not None:
+                    holder_stats["confidence_total"] = [0] * CONFIDENCE_BUCKETS
+                    holder_stats["confidence_correct"] = [0] * CONFIDENCE_BUCKETS
+                    for confidence_level, stats in legacy_calibration.items():
+                        bucket_index = min(max(int(float(confidence_level)) // 10, 0), CONFIDENCE_BUCKETS - 1)
+                        holder_stats["confidence_total"][bucket_index] += stats["total"]
+                        holder_stats["confidence_correct"][bucket_index] += stats["correct"]
+                    self._dirty.add("perf")
+                
+                # Per-sign tallies are Counters; older files nest {"total", "detected"} per sign
+                sign_stats = performance_stats["sign_stats"]
+                sign_stats["sign_total"] = Counter(sign_stats.get("sign_total", {}))
+                sign_stats["sign_detected"] = Counter(sign_stats.get("sign_detected", {}))
+                legacy_detection = sign_stats.pop("sign_detection_accuracy", None)
+                if legacy_detection:
+                    for sign, stats in legacy_detection.items():
+                        sign_stats["sign_total"][sign] += stats["total"]
+                        sign_stats["sign_detected"][sign] += stats["detected"]
+                    self._dirty.add("perf")
+                return performance_stats
         except Exception as e:
             print(f"⚠️ Could not load performance stats: {e}")
             
-        return {
-            "holder_stats": {
-                "total_processed": 0,
-                "correct_predictions": 0,
-                "accuracy_history": [],
-                "confidence_accuracy": {}
-            },
-            "sign_stats": {
-                "total_processed": 0,
-                "correct_predictions": 0,
-                "accuracy_history": [],
-                "sign_detection_accuracy": {}
-            }
-        }
+        return copy.deepcopy(EMPTY_PERFORMANCE_STATS)
     
     def load_common_mistakes(self):
         """Load common mistake patterns"""
         filepath = os.path.join(self.data_path, "common_mistakes.json")
         try:
             if os.path.exists(filepath):
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                with open(filepath, 'rb') as f:
+                    common_mistakes = _loads(f.read())
+                
+                # Holder mistakes are keyed by label id tuples; "labels" is the id -> name table
+                labels = common_mistakes.setdefault("labels", [])
+                label_ids = {label: label_id for label_id, label in enumerate(labels)}
+                holder_mistakes = Counter()
+                for key, count in common_mistakes.get("holder_mistakes", {}).items():
+                    holder_mistakes[_decode_mistake_key(key, labels, label_ids)] += count
+                
+                # Mistake tallies are Counters for cheap top-k queries
+                common_mistakes["holder_mistakes"] = holder_mistakes
+                common_mistakes["sign_mistakes"] = Counter(common_mistakes.get("sign_mistakes", {}))
+                
+                # Older files have no sign error tallies; count them once from the corrections log
+                if "missed_signs" in common_mistakes:
+                    common_mistakes["missed_signs"] = Counter(common_mistakes["missed_signs"])
+                    common_mistakes["false_positive_signs"] = Counter(common_mistakes["false_positive_signs"])
+                else:
+                    common_mistakes["missed_signs"], common_mistakes["false_positive_signs"] = self._count_sign_errors()
+                    self._dirty.add("mistakes")
+                return common_mistakes
         except Exception as e:
             print(f"⚠️ Could not load common mistakes: {e}")
             
-        return {
-            "holder_mistakes": {},
-            "sign_mistakes": {},
-            "confusion_matrix": {}
-        }
+        return copy.deepcopy(EMPTY_COMMON_MISTAKES)
     
-    def save_learning_data(self):
-        """Save all learning data to files"""
+    def save_learning_data(self, force=False):
+        """Save changed learning data to files
+        
+        Saves are coalesced: unless force is set, nothing is written until
+        flush_every records are pending or flush_interval seconds have passed.
+        Only files whose data changed since the last save are rewritten.
+        
+        Writes are atomic but not durable: files are never fsynced, so a crash
+        can lose the aggregates of up to flush_every unsaved records.
+        """
+        if not self._dirty:
+            return True
+        
+        if not force and (self._pending_writes < self.flush_every and
+                          time.monotonic() - self._last_flush < self.flush_interval):
+            return True
+        
         try:
-            # Save holder learning database
-            with open(os.path.join(self.data_path, "holder_learning.json"), 'w', encoding='utf-8') as f:
-                json.dump(self.holder_learning_db, f, indent=2, ensure_ascii=False)
-            
-            # Save sign learning database
-            with open(os.path.join(self.data_path, "sign_learning.json"), 'w', encoding='utf-8') as f:
-                json.dump(self.sign_learning_db, f, indent=2, ensure_ascii=False)
-            
-            # Save performance stats
-            with open(os.path.join(self.data_path, "performance_stats.json"), 'w', encoding='utf-8') as f:
-                json.dump(self.performance_stats, f, indent=2, ensure_ascii=False)
-            
-            # Save common mistakes
-            with open(os.path.join(self.data_path, "common_mistakes.json"), 'w', encoding='utf-8') as f:
-                json.dump(self.common_mistakes, f, indent=2, ensure_ascii=False)
+            for tag in list(self._dirty):
+                filename, attribute = LEARNING_FILES[tag]
+                filepath = os.path.join(self.data_path, filename)
+                if tag == "mistakes":
+                    data = _dumps(self._encode_common_mistakes())
+                else:
+                    data = _dumps(getattr(self, attribute))
                 
-            return True
+                self._write_file(filepath, data)
+                self._dirty.discard(tag)
+            
+            self._pending_writes = 0
+            self._last_flush = time.monotonic()
             
         except Exception as e:
             print(f"❌ Failed to save learning data: {e}")
             return False
+        
+        # Archiving reports its own errors; the snapshots above are already saved
+        self.archive_prediction_logs()
+        return True
+    
+    def _write_file(self, filepath, data):
+        """Write a learning data file atomically"""
+        # Write to a temp file and swap it in, so a crash never leaves half a file.
+        # No fsync here on purpose; the OS flushes the page cache on its own schedule.
+        temp_path = filepath + ".tmp"
+        with open(temp_path, 'wb', buffering=WRITE_BUFFER_SIZE) as f:
+            f.write(data)
+        os.replace(temp_path, filepath)
+    
+    def flush(self):
+        """Write all pending learning data to disk"""
+        return self.save_learning_data(force=True)
+    
+    def _encode_common_mistakes(self):
+        """Get common mistakes with tuple keys encoded as JSON strings"""
+        common_mistakes = dict(self.common_mistakes)
+        common_mistakes["holder_mistakes"] = {
+            _encode_mistake_key(mistake_key): count
+            for mistake_key, count in self.common_mistakes["holder_mistakes"].items()
+        }
+        return common_mistakes
+    
+    def _label_id(self, label):
+        """Get the id of a material/type label in the mistake label table"""
+        return _intern_label(label, self.common_mistakes["labels"], self._label_ids)
+    
+    def _format_mistake(self, mistake_key):
+        """Format a mistake key as "material+type -> material+type" for display"""
+        labels = self.common_mistakes["labels"]
+        predicted_material, predicted_type, actual_material, actual_type = (labels[i] for i in mistake_key)
+        return f"{predicted_material}+{predicted_type} -> {actual_material}+{actual_type}"
     
     def record_holder_prediction(self, holder_id, image_url, predicted_material, predicted_type, 
                                confidence, actual_material=None, actual_type=None, user_feedback=None):
         """Record a holder prediction for learning"""
         
-        timestamp = datetime.now().isoformat()
+        timestamp = time.time()
         
         prediction_record = {
             "timestamp": timestamp,
@@ -149,58 +674,69 @@ class LearningSystem:
         }
         
         # Determine if prediction was correct
+        correct = None
         if actual_material and actual_type:
-            prediction_record["correct"] = (
-                predicted_material == actual_material and 
-                predicted_type == actual_type
-            )
+            correct = predicted_material == actual_material and predicted_type == actual_type
+            prediction_record["correct"] = correct
             
             # Update performance stats
-            self.performance_stats["holder_stats"]["total_processed"] += 1
-            if prediction_record["correct"]:
-                self.performance_stats["holder_stats"]["correct_predictions"] += 1
+            self._dirty.add("perf")
+            holder_stats = self.performance_stats["holder_stats"]
+            holder_stats["total_processed"] += 1
+            if correct:
+                holder_stats["correct_predictions"] += 1
             
             # Update accuracy history
-            current_accuracy = (
-                self.performance_stats["holder_stats"]["correct_predictions"] / 
-                self.performance_stats["holder_stats"]["total_processed"]
-            )
-            self.performance_stats["holder_stats"]["accuracy_history"].append({
+            current_accuracy = holder_stats["correct_predictions"] / holder_stats["total_processed"]
+            holder_stats["accuracy_history"].append({
                 "timestamp": timestamp,
                 "accuracy": current_accuracy
             })
             
             # Record confidence calibration
-            confidence_bucket = round(confidence * 10) * 10  # Round to nearest 10%
-            if confidence_bucket not in self.performance_stats["holder_stats"]["confidence_accuracy"]:
-                self.performance_stats["holder_stats"]["confidence_accuracy"][confidence_bucket] = {
-                    "total": 0, "correct": 0
-                }
-            
-            self.performance_stats["holder_stats"]["confidence_accuracy"][confidence_bucket]["total"] += 1
-            if prediction_record["correct"]:
-                self.performance_stats["holder_stats"]["confidence_accuracy"][confidence_bucket]["correct"] += 1
+            bucket_index = min(max(round(confidence * 10), 0), CONFIDENCE_BUCKETS - 1)  # Nearest 10%
+            holder_stats["confidence_total"][bucket_index] += 1
+            if correct:
+                holder_stats["confidence_correct"][bucket_index] += 1
         
         # Add to learning database
-        if prediction_record["correct"] == True:
-            self.holder_learning_db["successful_predictions"].append(prediction_record)
-        elif prediction_record["correct"] == False:
-            self.holder_learning_db["corrections"].append(prediction_record)
+        if correct == True:
+            self._log_prediction("holder", "successful_predictions", prediction_record)
+        elif correct == False:
+            self._log_prediction("holder", "corrections", prediction_record)
+            self._dirty.add("mistakes")
             
             # Record common mistake
-            mistake_key = f"{predicted_material}+{predicted_type} -> {actual_material}+{actual_type}"
-            if mistake_key not in self.common_mistakes["holder_mistakes"]:
-                self.common_mistakes["holder_mistakes"][mistake_key] = 0
-            self.common_mistakes["holder_mistakes"][mistake_key] += 1
-        
+            label_id = self._label_id
+            mistake_key = (label_id(predicted_material), label_id(predicted_type),
+                           label_id(actual_material), label_id(actual_type))
+            holder_mistakes = self.common_mistakes["holder_mistakes"]
+            holder_mistakes[mistake_key] += 1
+            self._update_top_mistakes(mistake_key, holder_mistakes[mistake_key])
+        
+        self._data_version += 1
+        self._pending_writes += 1
         self.save_learning_data()
         return prediction_record
     
+    def _update_top_mistakes(self, mistake_key, count):
+        """Keep the TOP_MISTAKES most frequent holder mistakes up to date"""
+        top_mistakes = self._top_mistakes
+        if mistake_key in top_mistakes or len(top_mistakes) < TOP_MISTAKES:
+            top_mistakes[mistake_key] = count
+            return
+        
+        # Counts only grow by one, so a mistake outside the top can at most tie the weakest entry
+        weakest_key = min(top_mistakes, key=top_mistakes.get)
+        if count > top_mistakes[weakest_key]:
+            del top_mistakes[weakest_key]
+            top_mistakes[mistake_key] = count
+    
     def record_sign_prediction(self, holder_id, image_url, predicted_signs, confidence,
                              actual_signs=None, user_feedback=None):
         """Record a sign prediction for learning"""
         
-        timestamp = datetime.now().isoformat()
+        timestamp = time.time()
         
         prediction_record = {
             "timestamp": timestamp,
@@ -214,12 +750,14 @@ class LearningSystem:
         }
         
         # Determine if prediction was correct
+        correct = None
         if actual_signs is not None:
-            predicted_set = set(predicted_signs)
-            actual_set = set(actual_signs)
+            predicted_set = frozenset(predicted_signs)
+            actual_set = frozenset(actual_signs)
+            detected_set = predicted_set & actual_set
             
             # Calculate accuracy metrics
-            correct_signs = len(predicted_set.intersection(actual_set))
+            correct_signs = len(detected_set)
             total_actual = len(actual_set)
             total_predicted = len(predicted_set)
             
@@ -227,43 +765,54 @@ class LearningSystem:
             precision = correct_signs / total_predicted if total_predicted > 0 else 0
             recall = correct_signs / total_actual if total_actual > 0 else 0
             
+            f1_score = (2 * precision * recall) / (precision + recall) if (precision + recall) > 0 else 0
+            correct = f1_score >= 0.8  # Consider F1 >= 0.8 as correct
+            
             prediction_record["precision"] = precision
             prediction_record["recall"] = recall
-            prediction_record["f1_score"] = (2 * precision * recall) / (precision + recall) if (precision + recall) > 0 else 0
-            prediction_record["correct"] = prediction_record["f1_score"] >= 0.8  # Consider F1 >= 0.8 as correct
+            prediction_record["f1_score"] = f1_score
+            prediction_record["correct"] = correct
             
             # Update performance stats
-            self.performance_stats["sign_stats"]["total_processed"] += 1
-            if prediction_record["correct"]:
-                self.performance_stats["sign_stats"]["correct_predictions"] += 1
+            self._dirty.add("perf")
+            sign_stats = self.performance_stats["sign_stats"]
+            sign_stats["total_processed"] += 1
+            if correct:
+                sign_stats["correct_predictions"] += 1
             
             # Record individual sign accuracy
-            for sign in actual_signs:
-                if sign not in self.performance_stats["sign_stats"]["sign_detection_accuracy"]:
-                    self.performance_stats["sign_stats"]["sign_detection_accuracy"][sign] = {"total": 0, "detected": 0}
-                
-                self.performance_stats["sign_stats"]["sign_detection_accuracy"][sign]["total"] += 1
-                if sign in predicted_signs:
-                    self.performance_stats["sign_stats"]["sign_detection_accuracy"][sign]["detected"] += 1
+            sign_stats["sign_total"].update(actual_set)
+            sign_stats["sign_detected"].update(detected_set)
         
         # Add to learning database
-        if prediction_record["correct"] == True:
-            self.sign_learning_db["successful_predictions"].append(prediction_record)
-        elif prediction_record["correct"] == False:
-            self.sign_learning_db["corrections"].append(prediction_record)
+        if correct == True:
+            self._log_prediction("sign", "successful_predictions", prediction_record)
+        elif correct == False:
+            self._log_prediction("sign", "corrections", prediction_record)
+            self._dirty.add("mistakes")
+            
+            # Signs that were missed (in actual but not predicted) and false positives
+            self.common_mistakes["missed_signs"].update(actual_set - predicted_set)
+            self.common_mistakes["false_positive_signs"].update(predicted_set - actual_set)
         
+        self._data_version += 1
+        self._pending_writes += 1
         self.save_learning_data()
         return prediction_record
     
     def get_learning_insights(self):
         """Get insights from learning data for prompt optimization"""
         
+        if self._insights_cache and self._insights_cache[0] == self._data_version:
+            return self._insights_cache[1]
+        
         insights = {
             "holder_insights": self._analyze_holder_learning(),
             "sign_insights": self._analyze_sign_learning(),
             "overall_performance": self._get_overall_performance()
         }
         
+        self._insights_cache = (self._data_version, insights)
         return insights
     
     def _analyze_holder_learning(self):
@@ -278,22 +827,24 @@ class LearningSystem:
         }
         
         # Analyze common mistakes
-        if self.common_mistakes["holder_mistakes"]:
-            sorted_mistakes = sorted(
-                self.common_mistakes["holder_mistakes"].items(),
-                key=lambda x: x[1], reverse=True
-            )
-            insights["most_common_mistakes"] = dict(sorted_mistakes[:5])
+        if self._top_mistakes:
+            top_mistakes = sorted(self._top_mistakes.items(), key=lambda item: item[1], reverse=True)
+            insights["most_common_mistakes"] = {
+                self._format_mistake(mistake_key): count
+                for mistake_key, count in top_mistakes
+            }
         
         # Analyze confidence calibration
-        conf_cal = self.performance_stats["holder_stats"]["confidence_accuracy"]
-        for confidence_level, stats in conf_cal.items():
-            if stats["total"] > 0:
-                actual_accuracy = stats["correct"] / stats["total"]
+        holder_stats = self.performance_stats["holder_stats"]
+        calibration = zip(holder_stats["confidence_total"], holder_stats["confidence_correct"])
+        for bucket_index, (total, correct) in enumerate(calibration):
+            if total > 0:
+                confidence_level = bucket_index * 10
+                actual_accuracy = correct / total
                 insights["confidence_calibration"][confidence_level] = {
                     "predicted_confidence": confidence_level,
                     "actual_accuracy": actual_accuracy,
-                    "calibration_error": abs(confidence_level/100 - actual_accuracy)
+                    "calibration_error": abs(bucket_index / 10 - actual_accuracy)
                 }
         
         # Generate recommendations
@@ -317,13 +868,13 @@ class LearningSystem:
         }
         
         # Analyze sign detection accuracy
-        sign_accuracy = self.performance_stats["sign_stats"]["sign_detection_accuracy"]
-        if sign_accuracy:
+        sign_stats = self.performance_stats["sign_stats"]
+        if sign_stats["sign_total"]:
             # Calculate detection rates
             detection_rates = {}
-            for sign, stats in sign_accuracy.items():
-                if stats["total"] > 0:
-                    detection_rates[sign] = stats["detected"] / stats["total"]
+            for sign, total in sign_stats["sign_total"].items():
+                if total > 0:
+                    detection_rates[sign] = sign_stats["sign_detected"][sign] / total
             
             # Find hardest and easiest signs
             if detection_rates:
@@ -363,14 +914,15 @@ class LearningSystem:
             )
         
         # Analyze accuracy trends
-        holder_history = self.performance_stats["holder_stats"]["accuracy_history"]
-        if len(holder_history) >= 10:
-            recent_accuracy = [h["accuracy"] for h in holder_history[-10:]]
-            earlier_accuracy = [h["accuracy"] for h in holder_history[-20:-10]] if len(holder_history) >= 20 else []
+        # Snapshot the deque; record_* may append to it from the worker thread
+        last_20 = list(self.performance_stats["holder_stats"]["accuracy_history"])[-20:]
+        if len(last_20) >= 10:
+            recent_accuracy = [h["accuracy"] for h in last_20[-10:]]
+            earlier_accuracy = [h["accuracy"] for h in last_20[:-10]] if len(last_20) >= 20 else []
             
             if earlier_accuracy:
-                recent_avg = statistics.mean(recent_accuracy)
-                earlier_avg = statistics.mean(earlier_accuracy)
+                recent_avg = statistics.fmean(recent_accuracy)
+                earlier_avg = statistics.fmean(earlier_accuracy)
                 
                 if recent_avg > earlier_avg + 0.05:
                     performance["holder_bot"]["accuracy_trend"] = "improving"
@@ -382,6 +934,9 @@ class LearningSystem:
     def get_optimized_prompts(self):
         """Generate optimized prompts based on learning data"""
         
+        if self._prompts_cache and self._prompts_cache[0] == self._data_version:
+            return self._prompts_cache[1]
+        
         insights = self.get_learning_insights()
         
         optimized_prompts = {
@@ -389,6 +944,7 @@ class LearningSystem:
             "sign_prompt_additions": self._generate_sign_prompt_improvements(insights)
         }
         
+        self._prompts_cache = (self._data_version, optimized_prompts)
         return optimized_prompts
     
     def _generate_holder_prompt_improvements(self, insights):
@@ -453,6 +1009,11 @@ class LearningSystem:
         print(f"   🚦 SIGNBOT: {performance['sign_bot']['current_accuracy']:.1%} accuracy "
               f"({performance['sign_bot']['total_processed']} processed)")
         
+        for bot, label in (("holder", "🏗️ HOLDERBOT"), ("sign", "🚦 SIGNBOT")):
+            if self.recent_predictions[bot]["timestamp"]:
+                last_timestamp = self.recent_predictions[bot]["timestamp"][-1]
+                print(f"   {label} last prediction: {_format_timestamp(last_timestamp)}")
+        
         print(f"\n🎯 KEY INSIGHTS:")
         
         # Holder insights
@@ -494,14 +1055,10 @@ class LearningSystem:
             total = stats["total_processed"]
             correct = stats["correct_predictions"]
             
-            # Calculate average confidence from recent predictions
-            avg_confidence = 0.0
-            if hasattr(self, 'holder_learning_db') and self.holder_learning_db:
-                all_predictions = (self.holder_learning_db.get("successful_predictions", []) + 
-                                 self.holder_learning_db.get("corrections", []))
-                if all_predictions:
-                    confidences = [p.get("confidence", 0.5) for p in all_predictions[-10:]]  # Last 10
-                    avg_confidence = sum(confidences) / len(confidences) if confidences else 0.0
+            # Average confidence of the last 10 predictions; snapshot the deque
+            # first since record_* may append to it from the worker thread
+            recent_confidences = list(self.recent_predictions["holder"]["confidence"])[-10:]
+            avg_confidence = statistics.fmean(recent_confidences) if recent_confidences else 0.0
             
             return {
                 'total_predictions': total,
@@ -516,14 +1073,10 @@ class LearningSystem:
             total = stats["total_processed"]
             correct = stats["correct_predictions"]
             
-            # Calculate average confidence from recent predictions
-            avg_confidence = 0.0
-            if hasattr(self, 'sign_learning_db') and self.sign_learning_db:
-                all_predictions = (self.sign_learning_db.get("successful_predictions", []) + 
-                                 self.sign_learning_db.get("corrections", []))
-                if all_predictions:
-                    confidences = [p.get("confidence", 0.5) for p in all_predictions[-10:]]  # Last 10
-                    avg_confidence = sum(confidences) / len(confidences) if confidences else 0.0
+            # Average confidence of the last 10 predictions; snapshot the deque
+            # first since record_* may append to it from the worker thread
+            recent_confidences = list(self.recent_predictions["sign"]["confidence"])[-10:]
+            avg_confidence = statistics.fmean(recent_confidences) if recent_confidences else 0.0
             
             return {
                 'total_predictions': total,
@@ -545,6 +1098,10 @@ class LearningSystem:
     
     def analyze_errors(self):
         """Analyze errors and patterns for both holder and sign predictions"""
+        
+        if self._errors_cache and self._errors_cache[0] == self._data_version:
+            return self._errors_cache[1]
+        
         analysis = {
             'holder_errors': {},
             'sign_errors': {},
@@ -552,56 +1109,41 @@ class LearningSystem:
             'confidence_issues': []
         }
         
-        # Analyze holder errors
-        holder_corrections = self.holder_learning_db.get("corrections", [])
-        if holder_corrections:
-            # Count error types
+        # Analyze holder errors - every correction is tallied in holder_mistakes
+        holder_stats = self.performance_stats["holder_stats"]
+        if holder_stats["total_processed"] > holder_stats["correct_predictions"]:
+            labels = self.common_mistakes["labels"]
             material_errors = Counter()
             type_errors = Counter()
+            for (predicted_material, predicted_type, actual_material, actual_type), count in \
+                    self.common_mistakes["holder_mistakes"].items():
+                if predicted_material != actual_material:
+                    material_errors[(predicted_material, actual_material)] += count
+                if predicted_type != actual_type:
+                    type_errors[(predicted_type, actual_type)] += count
             
-            for correction in holder_corrections:
-                if correction.get("predicted") and correction.get("actual"):
-                    predicted = correction["predicted"]
-                    actual = correction["actual"]
-                    
-                    if predicted["material"] != actual["material"]:
-                        error_key = f"{predicted['material']} → {actual['material']}"
-                        material_errors[error_key] += 1
-                    
-                    if predicted["type"] != actual["type"]:
-                        error_key = f"{predicted['type']} → {actual['type']}"
-                        type_errors[error_key] += 1
-            
-            analysis['holder_errors']['material_confusion'] = dict(material_errors.most_common(5))
-            analysis['holder_errors']['type_confusion'] = dict(type_errors.most_common(5))
+            analysis['holder_errors']['material_confusion'] = {
+                f"{labels[predicted]} → {labels[actual]}": count
+                for (predicted, actual), count in material_errors.most_common(5)
+            }
+            analysis['holder_errors']['type_confusion'] = {
+                f"{labels[predicted]} → {labels[actual]}": count
+                for (predicted, actual), count in type_errors.most_common(5)
+            }
         
         # Analyze sign errors
-        sign_corrections = self.sign_learning_db.get("corrections", [])
-        if sign_corrections:
-            missed_signs = Counter()
-            false_positives = Counter()
-            
-            for correction in sign_corrections:
-                predicted_signs = set(correction.get("predicted_signs", []))
-                actual_signs = set(correction.get("actual_signs", []))
-                
-                # Signs that were missed (in actual but not predicted)
-                for missed in actual_signs - predicted_signs:
-                    missed_signs[missed] += 1
-                
-                # False positives (predicted but not actual)
-                for false_pos in predicted_signs - actual_signs:
-                    false_positives[false_pos] += 1
-            
-            analysis['sign_errors']['frequently_missed'] = dict(missed_signs.most_common(5))
-            analysis['sign_errors']['false_positives'] = dict(false_positives.most_common(5))
+        sign_stats = self.performance_stats["sign_stats"]
+        if sign_stats["total_processed"] > sign_stats["correct_predictions"]:
+            analysis['sign_errors']['frequently_missed'] = dict(self.common_mistakes["missed_signs"].most_common(5))
+            analysis['sign_errors']['false_positives'] = dict(self.common_mistakes["false_positive_signs"].most_common(5))
         
         # Identify confidence calibration issues
-        holder_stats = self.performance_stats["holder_stats"]
-        for conf_level, stats in holder_stats.get("confidence_accuracy", {}).items():
-            if stats["total"] >= 5:  # Only analyze if we have enough data
-                actual_accuracy = stats["correct"] / stats["total"]
-                predicted_confidence = conf_level / 100.0
+        calibration = zip(holder_stats["confidence_total"], holder_stats["confidence_correct"])
+        for bucket_index, (total, correct) in enumerate(calibration):
+            if total >= 5:  # Only analyze if we have enough data
+                conf_level = bucket_index * 10
+                actual_accuracy = correct / total
+                predicted_confidence = bucket_index / 10
                 
                 if abs(actual_accuracy - predicted_confidence) > 0.2:  # 20% calibration error
                     analysis['confidence_issues'].append({
@@ -611,8 +1153,22 @@ class LearningSystem:
                         'error_type': 'overconfident' if predicted_confidence > actual_accuracy else 'underconfident'
                     })
         
+        self._errors_cache = (self._data_version, analysis)
         return analysis
     
+    def _count_sign_errors(self):
+        """Count missed signs and false positives over the whole sign corrections log"""
+        missed_signs = Counter()
+        false_positives = Counter()
+        
+        for correction in self._iter_prediction_log("sign", "corrections"):
+            predicted_signs = frozenset(correction.get("predicted_signs", []))
+            actual_signs = frozenset(correction.get("actual_signs", []))
+            missed_signs.update(actual_signs - predicted_signs)
+            false_positives.update(predicted_signs - actual_signs)
+        
+        return missed_signs, false_positives
+    
     def get_optimization_suggestions(self):
         """Generate optimization suggestions based on error analysis"""
         analysis = self.analyze_errors()
@@ -711,56 +1267,37 @@ class LearningSystem:
         """Clear all learning data and reset the system"""
         try:
             # Reset learning databases
-            self.holder_learning_db = {
-                "corrections": [],
-                "successful_predictions": [],
-                "image_patterns": {},
-                "confidence_calibration": {},
-                "prompt_effectiveness": {}
-            }
+            self.holder_learning_db = copy.deepcopy(EMPTY_LEARNING_DB)
+            self.sign_learning_db = copy.deepcopy(EMPTY_LEARNING_DB)
             
-            self.sign_learning_db = {
-                "corrections": [],
-                "successful_predictions": [],
-                "image_patterns": {},
-                "confidence_calibration": {},
-                "prompt_effectiveness": {}
+            self.recent_predictions = {
+                "holder": self._new_recent_columns(),
+                "sign": self._new_recent_columns()
             }
             
             # Reset performance stats
-            self.performance_stats = {
-                "holder_stats": {
-                    "total_processed": 0,
-                    "correct_predictions": 0,
-                    "accuracy_history": [],
-                    "confidence_accuracy": {}
-                },
-                "sign_stats": {
-                    "total_processed": 0,
-                    "correct_predictions": 0,
-                    "accuracy_history": [],
-                    "sign_detection_accuracy": {}
-                }
-            }
+            self.performance_stats = copy.deepcopy(EMPTY_PERFORMANCE_STATS)
             
             # Reset common mistakes
-            self.common_mistakes = {
-                "holder_mistakes": {},
-                "sign_mistakes": {},
-                "confusion_matrix": {}
-            }
+            self.common_mistakes = copy.deepcopy(EMPTY_COMMON_MISTAKES)
+            
+            self._label_ids = {}
+            self._top_mistakes = {}
             
             # Save the cleared data
-            success = self.save_learning_data()
+            self._data_version += 1
+            self._dirty.update(LEARNING_FILES)
+            success = self.save_learning_data(force=True)
             
             # Also remove the physical files to ensure clean slate
-            import glob
-            data_files = glob.glob(os.path.join(self.data_path, "*.json"))
-            for file_path in data_files:
-                try:
-                    os.remove(file_path)
-                except Exception as e:
-                    print(f"⚠️ Could not remove {file_path}: {e}")
+            with os.scandir(self.data_path) as entries:
+                for entry in entries:
+                    if not entry.is_file() or not entry.name.endswith(DATA_FILE_SUFFIXES):
+                        continue
+                    try:
+                        os.remove(entry.path)
+                    except Exception as e:
+                        print(f"⚠️ Could not remove {entry.path}: {e}")
             
             return success
             